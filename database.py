@@ -2,16 +2,160 @@
 create a sqlite database from the yelp dataset
 
 """
-from utils import load_config, flatten_dict, file_line_generator
+from utils import load_config, flatten_dict, file_line_generator, json_loads
 import pandas as pd
+import json
+import mmap
+import sqlite3
 from pathlib import Path
-import re
+from concurrent.futures import ProcessPoolExecutor
 
-from sqlalchemy import create_engine, MetaData, Table, Column, ForeignKey, UniqueConstraint, select, update
+from sqlalchemy import create_engine, event, MetaData, Table, Column, ForeignKey, select, text
 from sqlalchemy.dialects.sqlite import Insert, INTEGER, VARCHAR, TEXT, REAL
 from sqlalchemy.exc import IntegrityError
 
 
+# number of businesses read from business.json per pandas chunk
+BUSINESS_CHUNK_SIZE = 50000
+
+# number of rows per multi-row insert issued by DataFrame.to_sql
+TO_SQL_CHUNK_SIZE = 1000
+
+# business.json text columns, stripped of surrounding whitespace with missing values stored as ''
+BUSINESS_STR_COLUMNS = ['business_id', 'name', 'address', 'city', 'state', 'postal_code']
+
+# business.json columns stored in the business table
+BUSINESS_COLUMNS = [
+    'business_id_str', 'name', 'address', 'city', 'state', 'postal_code',
+    'latitude', 'longitude', 'stars', 'review_count', 'is_open'
+]
+
+# number of rows inserted per executemany batch by the review, tip, checkin and photo loaders
+ROW_BATCH_SIZE = 10000
+
+# number of users whose friends are staged per executemany batch
+FRIENDS_BATCH_SIZE = 50000
+
+# rows of the days table, ids start at 1 for Monday
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# (index name, table, columns) unique indexes built after loading by YelpDataBase._create_indexes
+UNIQUE_INDEXES = (
+    ('ix_business_business_id_str', 'business', ('business_id_str',)),
+    ('ix_days_day', 'days', ('day',)),
+    ('ix_hours_business_id_day_id', 'hours', ('business_id', 'day_id')),
+    ('ix_users_user_id_str', 'users', ('user_id_str',)),
+    ('ix_reviews_review_id_str', 'reviews', ('review_id_str',)),
+    ('ix_category_name', 'category', ('name',)),
+    ('ix_category_business_category_id_business_id', 'category_business', ('category_id', 'business_id')),
+    ('ix_friends_user1_id_user2_id', 'friends', ('user1_id', 'user2_id')),
+    ('ix_attributes_name', 'attributes', ('name',)),
+    ('ix_business_attributes_attribute_id_business_id', 'business_attributes', ('attribute_id', 'business_id')),
+    ('ix_photos_photo_id_str', 'photos', ('photo_id_str',))
+)
+
+# bound parameter limit of a single sqlite statement (sqlite 3.32 or newer)
+SQLITE_MAX_VARIABLES = 32766
+
+# number of json lines loaded between commits
+CHECKPOINT_ROWS = 50000
+
+# sqlite settings applied to every new connection, tuned for bulk loading
+SQLITE_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'temp_store=MEMORY',
+    'cache_size=-262144',
+    'mmap_size=30000000000',
+    'locking_mode=EXCLUSIVE',
+    'foreign_keys=OFF'
+)
+
+# {loader method: tables it fills} for the loaders create_full_database can run in parallel,
+# tables are copied from the worker databases in this order
+PARALLEL_LOADERS = {
+    '_load_business_json': ('days', 'business', 'category', 'attributes', 'category_business', 'business_attributes', 'hours'),
+    '_load_users_json': ('users', 'elite')
+}
+
+# size in bytes of the review.json ranges parsed by separate processes
+REVIEW_RANGE_BYTES = 128 << 20
+
+# review.json keys and the reviews table columns they are stored in
+REVIEW_KEYS = ('review_id', 'user_id', 'business_id', 'stars', 'date', 'text', 'useful', 'funny', 'cool')
+REVIEW_COLUMNS = ('review_id_str', 'user_id', 'business_id', 'stars', 'date', 'text', 'useful', 'funny', 'cool')
+
+
+def _run_loader(config_file_path:str, database_path:str, loader_name:str, file_path:Path, verbose:bool) -> None:
+    """process pool worker, runs one YelpDataBase loader into its own database file
+
+    Args:
+        config_file_path (str): path to the config.yaml file
+        database_path (str): path to the worker database file
+        loader_name (str): name of the YelpDataBase loader method, a key of PARALLEL_LOADERS
+        file_path (Path): json file passed to the loader
+        verbose (bool): print out progress using YelpDataBase.verbose_loading
+    """
+    ydb = YelpDataBase(config_file_path)
+    ydb.database_path = database_path
+    ydb.connect()
+    ydb._create_base_tables()
+    getattr(ydb, loader_name)(file_path, verbose)
+    ydb.engine.dispose()
+
+
+def _index_jsonl(file_path:Path, chunk_bytes:int=REVIEW_RANGE_BYTES) -> list:
+    """splits a json lines file into byte ranges of about chunk_bytes,
+        every range starts at the beginning of a line
+
+    Args:
+        file_path (Path): path to the json lines file
+        chunk_bytes (int, optional): size of a range. Defaults to REVIEW_RANGE_BYTES.
+
+    Returns:
+        list[tuple[int, int]]: (start, end) byte offsets of the ranges
+    """
+    file_size = file_path.stat().st_size
+    offsets = [0]
+    with open(file_path, 'rb') as f:
+        while offsets[-1] + chunk_bytes < file_size:
+            f.seek(offsets[-1] + chunk_bytes)
+            f.readline()
+            offsets.append(f.tell())
+    if offsets[-1] != file_size:
+        offsets.append(file_size)
+    return list(zip(offsets, offsets[1:]))
+
+
+def _parse_review_range(staging_path:str, review_file_path:Path, start:int, end:int) -> None:
+    """process pool worker, parses the review.json lines in one byte range into the
+        reviews_staging table of its own database file. user and business ids are
+        kept as strings, they are resolved by the process writing the reviews table.
+
+    Args:
+        staging_path (str): path to the worker database file
+        review_file_path (Path): path to review.json file
+        start (int): byte offset of the first line
+        end (int): byte offset after the last line
+    """
+    connection = sqlite3.connect(staging_path)
+    connection.execute(f'CREATE TABLE reviews_staging({", ".join(REVIEW_COLUMNS)})')
+    insert_sql = f'INSERT INTO reviews_staging VALUES ({", ".join("?" * len(REVIEW_COLUMNS))})'
+
+    with open(review_file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as review_map:
+        review_map.seek(start)
+        rows = []
+        while review_map.tell() < end:
+            review = json_loads(review_map.readline())
+            rows.append(tuple(review[key] for key in REVIEW_KEYS))
+            if len(rows) >= ROW_BATCH_SIZE:
+                connection.executemany(insert_sql, rows)
+                rows.clear()
+        connection.executemany(insert_sql, rows)
+
+    connection.commit()
+    connection.close()
+
 
 class YelpDataBase:
     """Builds a sqlite database from the yelp dataset
@@ -23,6 +167,7 @@ class YelpDataBase:
             config_file_path (str, optional): path to the config.yaml file. Defaults to 'config.yaml'.
         """
 
+        self.config_file_path = config_file_path
         config_obj = load_config(config_file_path, 'database')
         self.database_path = config_obj['database_file_path']
         self.raw_data_folder_path = config_obj['raw_data_folder_path']
@@ -32,10 +177,21 @@ class YelpDataBase:
         """creats a sqlalchemy engine and metadata object i.e connects to the database file
         """
         self.engine = create_engine(f'sqlite:///{self.database_path}')
+
+        @event.listens_for(self.engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            """applies SQLITE_PRAGMAS to the raw sqlite3 connection
+            """
+            cursor = dbapi_connection.cursor()
+            for pragma in SQLITE_PRAGMAS:
+                cursor.execute(f'PRAGMA {pragma}')
+            cursor.close()
+
         self.meta_data = MetaData(bind=self.engine)
 
-    def _create_tables_if_not_exist(self) -> None:
-        """creates all tables if they don't already exist in the database
+    def _create_base_tables(self) -> None:
+        """creates all tables if they don't already exist in the database.
+            unique indexes are left to self._create_indexes, which runs after loading
 
             Tables:
                 business - contains businesses and business attributes\n
@@ -58,7 +214,7 @@ class YelpDataBase:
             'business',
             self.meta_data,
             Column('id', INTEGER(), primary_key=True, autoincrement=True),
-            Column('business_id_str', VARCHAR(32), unique=True),
+            Column('business_id_str', VARCHAR(32)),
             Column('name', VARCHAR(256)),
             Column('address', VARCHAR(128)),
             Column('city', VARCHAR(128)),
@@ -76,7 +232,7 @@ class YelpDataBase:
             'days',
             self.meta_data,
             Column('id', INTEGER(), primary_key=True),
-            Column('day', VARCHAR(32), unique=True)
+            Column('day', VARCHAR(32))
         )
 
         # hours
@@ -85,8 +241,7 @@ class YelpDataBase:
             self.meta_data,
             Column('business_id', ForeignKey('business.id')),
             Column('day_id', ForeignKey('days.id')),
-            Column('open_hours', VARCHAR(128)),
-            UniqueConstraint('business_id', 'day_id')
+            Column('open_hours', VARCHAR(128))
         )
 
         # users
@@ -94,7 +249,7 @@ class YelpDataBase:
             'users',
             self.meta_data,
             Column('id', INTEGER(), primary_key=True, autoincrement=True),
-            Column('user_id_str', VARCHAR(32), unique=True),
+            Column('user_id_str', VARCHAR(32)),
             Column('name', VARCHAR(128)),
             Column('review_count', INTEGER()),
             Column('yelping_since', VARCHAR(32)),
@@ -130,7 +285,7 @@ class YelpDataBase:
             'reviews',
             self.meta_data,
             Column('id', INTEGER(), primary_key=True, autoincrement=True),
-            Column('review_id_str', VARCHAR(32), unique=True),
+            Column('review_id_str', VARCHAR(32)),
             Column('user_id', ForeignKey('users.id')),
             Column('business_id', ForeignKey('business.id')),
             Column('stars', INTEGER()),
@@ -166,7 +321,7 @@ class YelpDataBase:
             'category',
             self.meta_data,
             Column('id', INTEGER(), primary_key=True, autoincrement=True),
-            Column('name', VARCHAR(128), unique=True)
+            Column('name', VARCHAR(128))
         )
 
         # category - business - passthrough
@@ -174,8 +329,7 @@ class YelpDataBase:
             'category_business',
             self.meta_data,
             Column('category_id', ForeignKey('category.id')),
-            Column('business_id', ForeignKey('business.id')),
-            UniqueConstraint('category_id', 'business_id')
+            Column('business_id', ForeignKey('business.id'))
         )
 
         # friends - user user - passthrough
@@ -183,8 +337,7 @@ class YelpDataBase:
             'friends',
             self.meta_data,
             Column('user1_id', ForeignKey('users.id')),
-            Column('user2_id', ForeignKey('users.id')),
-            UniqueConstraint('user1_id', 'user2_id')
+            Column('user2_id', ForeignKey('users.id'))
         )
 
         # attributes
@@ -192,7 +345,7 @@ class YelpDataBase:
             'attributes',
             self.meta_data,
             Column('id', INTEGER(), primary_key=True, autoincrement=True),
-            Column('name', VARCHAR(128), unique=True)
+            Column('name', VARCHAR(128))
         )
 
         # business - attributes - passthrough
@@ -201,8 +354,7 @@ class YelpDataBase:
             self.meta_data,
             Column('attribute_id', ForeignKey('attributes.id')),
             Column('business_id', ForeignKey('business.id')),
-            Column('value', VARCHAR(128)),
-            UniqueConstraint('attribute_id', 'business_id')
+            Column('value', VARCHAR(128))
         )
 
         # photos
@@ -210,7 +362,7 @@ class YelpDataBase:
             'photos',
             self.meta_data,
             Column('id', INTEGER(), primary_key=True, autoincrement=True),
-            Column('photo_id_str', VARCHAR(32), unique=True),
+            Column('photo_id_str', VARCHAR(32)),
             Column('business_id', ForeignKey('business.id')),
             Column('caption', TEXT()),
             Column('label', TEXT())
@@ -219,6 +371,11 @@ class YelpDataBase:
 
         self.meta_data.create_all(checkfirst=True)
 
+        # one INSERT OR IGNORE statement per table, built once and reused by every loader
+        self._insert_statements = {
+            table_name: table.insert().prefix_with('OR IGNORE') for table_name, table in self.meta_data.tables.items()
+        }
+
     def verbose_loading(self, file_name:str, connecting_frineds:bool, verbose:bool):
         """function to show progress when populating the database
 
@@ -236,7 +393,7 @@ class YelpDataBase:
 
 
 
-    def create_full_database(self, verbose:bool=False, include_photos:bool=True) -> None:
+    def create_full_database(self, verbose:bool=False, include_photos:bool=True, parallel:bool=True) -> None:
         """reads the files from the raw data folder checks if the 
             required ones are present and populates the database
             busiess, user, and review json files are required.
@@ -244,8 +401,11 @@ class YelpDataBase:
         Args:
             verbose (bool, optional): whether to print out progress. Defaults to False.
             include_photos (bool, optional): wether to include the photos table. Defaults to True.
+            parallel (bool, optional): load business.json and user.json in separate processes
+                                       when their tables are empty and parse review.json in
+                                       byte ranges across processes. Defaults to True.
         """
-        self._create_tables_if_not_exist()
+        self._create_base_tables()
 
 
         base_path = Path(self.raw_data_folder_path)
@@ -283,13 +443,20 @@ class YelpDataBase:
        
         if business_ok and user_ok and review_ok:
 
-            self._load_business_json(business_file_path, verbose)
+            parallel_tables = [table for tables in PARALLEL_LOADERS.values() for table in tables if table != 'days']
+            if parallel and self._tables_are_empty(parallel_tables):
+                self._load_in_parallel(
+                    {'_load_business_json': business_file_path, '_load_users_json': user_file_path},
+                    verbose
+                )
+            else:
+                self._load_business_json(business_file_path, verbose)
 
-            self._load_users_json(user_file_path, verbose)
+                self._load_users_json(user_file_path, verbose)
             
             self._connect_users(user_file_path, verbose)
 
-            self._load_review_json(review_file_path, verbose)
+            self._load_review_json(review_file_path, verbose, parallel)
         else:
             print('failed! data folder must contain business, user, and review json files')
             return -1
@@ -303,64 +470,178 @@ class YelpDataBase:
         if photo_ok and include_photos:
             self._load_photos_json(photo_file_path, verbose)
 
+        self._create_indexes(verbose)
+
+        self._check_foreign_keys(verbose)
+
+    def _tables_are_empty(self, table_names:list) -> bool:
+        """check that none of the tables contain any rows
+
+        Args:
+            table_names (list[str]): names of the tables to check
+
+        Returns:
+            bool: True if every table is empty
+        """
+        with self.engine.connect() as conn:
+            return not any(conn.execute(text(f'SELECT EXISTS (SELECT 1 FROM {table_name})')).scalar() for table_name in table_names)
+
+    def _load_in_parallel(self, loader_files:dict, verbose:bool) -> None:
+        """runs data independent loaders in a process pool, each one writing to its own
+            temporary database file next to the database. the worker databases are then
+            attached and their tables copied over with the ids unchanged, so the tables
+            they fill must be empty in this database.
+
+        Args:
+            loader_files (dict): {loader method name: json file Path}, loaders from PARALLEL_LOADERS
+            verbose (bool): print out progress using self.verbose_loading
+        """
+        database_path = Path(self.database_path)
+        worker_paths = {loader_name: database_path.with_name(f'{loader_name.strip("_")}_tmp.db') for loader_name in loader_files}
+        for worker_path in worker_paths.values():
+            worker_path.unlink(missing_ok=True)
+
+        with ProcessPoolExecutor(max_workers=len(loader_files)) as executor:
+            futures = [
+                executor.submit(_run_loader, self.config_file_path, str(worker_paths[loader_name]), loader_name, file_path, verbose)
+                for loader_name, file_path in loader_files.items()
+            ]
+            for future in futures:
+                future.result()
+
+        with self.engine.connect() as conn:
+            for loader_name, worker_path in worker_paths.items():
+                conn.execute(text('ATTACH DATABASE :path AS worker'), {'path': str(worker_path)})
+                with conn.begin():
+                    for table_name in PARALLEL_LOADERS[loader_name]:
+                        conn.execute(text(f'INSERT OR IGNORE INTO main.{table_name} SELECT * FROM worker.{table_name}'))
+                conn.execute(text('DETACH DATABASE worker'))
+                worker_path.unlink()
+
+    def _check_foreign_keys(self, verbose:bool=False) -> int:
+        """foreign keys are not enforced while loading, the loaders resolve every
+            reference through their id maps. this runs PRAGMA foreign_key_check once
+            over the whole database and prints any violations it finds.
+
+        Args:
+            verbose (bool, optional): whether to print out progress. Defaults to False.
+
+        Returns:
+            int: number of rows that reference a missing parent row
+        """
+        if verbose:
+            print('Checking foreign keys')
+
+        with self.engine.connect() as conn:
+            violations = conn.execute(text('PRAGMA foreign_key_check')).fetchall()
+
+        violation_counts = {}
+        for table_name, _, parent_table_name, _ in violations:
+            violation_counts[(table_name, parent_table_name)] = violation_counts.get((table_name, parent_table_name), 0) + 1
+        for (table_name, parent_table_name), count in violation_counts.items():
+            print(f'foreign key check: {count} rows in {table_name} reference missing {parent_table_name} rows')
+
+        return len(violations)
+
+    def _create_indexes(self, verbose:bool=False) -> None:
+        """creates the UNIQUE_INDEXES once the tables are loaded, so each index is
+            built in one pass instead of updated on every insert. if duplicate rows
+            block an index the later duplicates are deleted and the index is retried.
+            finishes with ANALYZE so the query planner sees the new indexes.
+
+        Args:
+            verbose (bool, optional): whether to print out progress. Defaults to False.
+        """
+        if verbose:
+            print('Creating indexes')
+
+        with self.engine.begin() as conn:
+            for index_name, table_name, columns in UNIQUE_INDEXES:
+                column_list = ', '.join(columns)
+                create_index_statement = text(f'CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table_name}({column_list})')
+                try:
+                    conn.execute(create_index_statement)
+                except IntegrityError:
+                    not_null = ' AND '.join(f'{column} IS NOT NULL' for column in columns)
+                    conn.execute(text(
+                        f"""DELETE FROM {table_name}
+                        WHERE {not_null}
+                        AND rowid NOT IN (SELECT MIN(rowid) FROM {table_name} GROUP BY {column_list})"""
+                    ))
+                    conn.execute(create_index_statement)
+
+            conn.execute(text('ANALYZE'))
+
     def _initialize_days_table(self) -> dict:
-        """initializ the days table, monday through sunday
+        """initializ the days table, monday through sunday.
+            nothing is written if the table already holds all the DAYS
 
         Returns:
             dict: {day[str]: id[int]} dict for use in populating business table
         """
-        days_table = Table('days', self.meta_data, autoload_with=self.engine)
-        day_id_days_dict = {day: _id for _id, day in enumerate(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], start=1)}
+        days_table = self.meta_data.tables['days']
+        day_id_days_dict = {day: _id for _id, day in enumerate(DAYS, start=1)}
 
         with self.engine.begin() as conn:
-            days_insert_statement = Insert(days_table).values(
-                [{'id': _id, 'day': day} for _id, day in enumerate(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], start=1)]
-            ).on_conflict_do_nothing()
-            conn.execute(days_insert_statement)
-            
+            if conn.execute(text('SELECT COUNT(*) FROM days')).scalar() != len(DAYS):
+                days_insert_statement = Insert(days_table).values(
+                    [{'id': _id, 'day': day} for day, _id in day_id_days_dict.items()]
+                ).on_conflict_do_nothing()
+                conn.execute(days_insert_statement)
+
         return day_id_days_dict
     
-    def _get_add_user_id(self, connection, table, id_str) -> int:
-        """check if a user is in the users table, if yes return the users id,
-            else add the user to the table and return the id.
+    def _checkpoint(self, transaction):
+        """commits the current transaction and begins a new one on the same connection,
+            keeps the WAL file from growing without bound during a long load
 
         Args:
-            connection: sqlalchemy connection
-            table: sqlalchemy users table
-            id_str (str): user string id
+            transaction: sqlalchemy transaction
 
         Returns:
-            int: integer user id
+            sqlalchemy transaction: the new transaction
         """
-        id_statement = select([table.c.id]).where(table.c.user_id_str == id_str)
-        user_id = connection.execute(id_statement).fetchall()
-        try:
-            user_id = user_id[0][0]
-        except IndexError:
-            user_id_insert = Insert(table).values(user_id_str=id_str)
-            user_id = connection.execute(user_id_insert).inserted_primary_key[0]
-        return user_id
-    
-    def _get_add_business_id(self, connection, table, id_str) -> int:
-        """check if a business is in the business table, if yes return the business id,
-            else add the business to the table and return the id.
+        transaction.commit()
+        return transaction.connection.begin()
+
+    def _raw_insert_sql(self, table_name:str) -> str:
+        """INSERT OR IGNORE sql with a named parameter for every column except id,
+            for executemany on the raw sqlite3 connection
 
         Args:
-            connection: sqlalchemy connection
-            table: sqlalchemy business table
-            id_str (str): business string id
+            table_name (str): name of the table
 
         Returns:
-            int: integer business id
+            str: sql statement
+        """
+        column_names = [column.name for column in self.meta_data.tables[table_name].columns if column.name != 'id']
+        return f'INSERT OR IGNORE INTO {table_name}({", ".join(column_names)}) VALUES ({", ".join(":" + name for name in column_names)})'
+
+    def _flush_rows(self, connection, insert_sql:str, rows:list, id_maps:dict) -> None:
+        """replace the string ids in the rows with integer ids and insert the rows
+            with one executemany on the raw sqlite3 connection, skipping sqlalchemy's
+            per row parameter processing. string ids missing from an id map are added
+            to their table and the id map is updated. the rows list is cleared.
+
+        Args:
+            connection: sqlalchemy connection, the rows are inserted in its transaction
+            insert_sql (str): sql insert statement with named parameters, executed once for all the rows
+            rows (list[dict]): rows to insert, keyed by column name
+            id_maps (dict): {column name: (sqlalchemy string id column, {id_str: id})}
         """
-        id_statement = select([table.c.id]).where(table.c.business_id_str == id_str)
-        business_id = connection.execute(id_statement).fetchall()
-        try:
-            business_id = business_id[0][0]
-        except IndexError:
-            business_id_insert = Insert(table).values(user_id_str=id_str)
-            business_id = connection.execute(business_id_insert).inserted_primary_key[0]
-        return business_id
+        if not rows:
+            return
+
+        for column_name, (key_column, id_map) in id_maps.items():
+            missing = list(dict.fromkeys(row[column_name] for row in rows if row[column_name] not in id_map))
+            if missing:
+                id_map.update(self._insert_returning_ids(connection, key_column, [{key_column.name: key} for key in missing]))
+
+            for row in rows:
+                row[column_name] = id_map[row[column_name]]
+
+        connection.connection.executemany(insert_sql, rows)
+        rows.clear()
 
     def _load_business_json(self, business_file_path:Path, verbose:bool):
         """populates the business and business associated tables from business.json
@@ -372,85 +653,189 @@ class YelpDataBase:
 
         self.verbose_loading(business_file_path.name, False, verbose)
 
-        business_table = Table('business', self.meta_data, autoload_with=self.engine)
-        category_table = Table('category', self.meta_data, autoload_with=self.engine)
-        category_business_table = Table('category_business', self.meta_data, autoload_with=self.engine)
-        attributes_table = Table('attributes', self.meta_data, autoload_with=self.engine)
-        business_attributes_table = Table('business_attributes', self.meta_data, autoload_with=self.engine)
-        hours_table = Table('hours', self.meta_data, autoload_with=self.engine)
-
+        business_table = self.meta_data.tables['business']
         day_id_dict = self._initialize_days_table()
 
-        with self.engine.begin() as conn:
-            for business in file_line_generator(business_file_path):
-                    
-                    # business table
-                    business_statement = Insert(business_table).values(
-                        business_id_str=business['business_id'].strip(),
-                        name=business['name'].strip(),
-                        address=business['address'].strip(),
-                        city=business['city'].strip(),
-                        state=business['state'].strip(),
-                        postal_code=business['postal_code'].strip(),
-                        latitude=business['latitude'],
-                        longitude=business['longitude'],
-                        stars=business['stars'],
-                        review_count=business['review_count'],
-                        is_open=business['is_open']
-                    )
-                    try:
-                        business_id = conn.execute(business_statement).inserted_primary_key[0]
-                    except IntegrityError:
-                        continue
-                    # category table
-                    if business['categories'] is not None:
-                        business_categories = [b.strip() for b in business['categories'].split(', ')]
-                        category_statement = Insert(category_table).values(
-                            [{'name': category.strip()} for category in business_categories]
-                        ).on_conflict_do_nothing()
-
-                        conn.execute(category_statement)
-
-                        category_ids = conn.execute(select([category_table.c.id]).where(category_table.c.name.in_(business_categories))).fetchall()
-
-                        # category business table
-                        category_business_statement = Insert(category_business_table).values(
-                            [{'category_id': cat_id[0], 'business_id': business_id} for cat_id in category_ids]
-                        )
-                        conn.execute(category_business_statement)
-                    else:
-                        pass
+        category_table = self.meta_data.tables['category']
+        attributes_table = self.meta_data.tables['attributes']
+        category_names, attribute_names, attribute_table = self._scan_business_vocab(business_file_path)
 
-                    # attributes table
-                    if business['attributes'] is not None:
-                        attributes = flatten_dict(business['attributes'])
-                        attributes_statement = Insert(attributes_table).values(
-                            [{'name': cat_name.strip()} for cat_name in attributes.keys()]
-                        ).on_conflict_do_nothing()
+        with self.engine.connect() as conn:
+            transaction = conn.begin()
+
+            id_maps = {
+                'business': self._get_id_map(conn, business_table.c.business_id_str),
+                'category': self._get_id_map(conn, category_table.c.name),
+                'attributes': self._get_id_map(conn, attributes_table.c.name),
+                'days': day_id_dict
+            }
+
+            # the unique indexes may not exist yet, so only new names are inserted
+            new_category_names = [name for name in category_names if name not in id_maps['category']]
+            if new_category_names:
+                conn.execute(self._insert_statements['category'], [{'name': name} for name in new_category_names])
+                id_maps['category'] = self._get_id_map(conn, category_table.c.name)
+            new_attribute_names = [name for name in attribute_names if name not in id_maps['attributes']]
+            if new_attribute_names:
+                conn.execute(self._insert_statements['attributes'], [{'name': name} for name in new_attribute_names])
+                id_maps['attributes'] = self._get_id_map(conn, attributes_table.c.name)
+
+            with pd.read_json(business_file_path, lines=True, chunksize=BUSINESS_CHUNK_SIZE, dtype=False, convert_dates=False) as reader:
+                for chunk in reader:
+                    self._insert_business_chunk(conn, chunk, id_maps, attribute_table)
+                    transaction = self._checkpoint(transaction)
+
+            transaction.commit()
+
+    def _insert_returning_ids(self, connection, key_column, rows:list) -> dict:
+        """insert rows with multi row INSERT ... RETURNING statements on the raw sqlite3
+            connection, so the new ids come back with the insert instead of from a
+            second select. needs sqlite 3.35 or newer, the sqlalchemy 1.4 sqlite
+            dialect does not support RETURNING.
 
-                        conn.execute(attributes_statement)
+        Args:
+            connection: sqlalchemy connection, the rows are inserted in its transaction
+            key_column: sqlalchemy column holding the unique keys, the table must have an id column
+            rows (list[dict]): rows to insert, all keyed by the same column names including the key column
 
-                        attribute_ids_terms = conn.execute(select(attributes_table).where(attributes_table.c.name.in_(attributes.keys()))).fetchall()
+        Returns:
+            dict: {key[str]: id[int]} for the inserted rows
+        """
+        column_names = list(rows[0])
+        row_sql = f'({", ".join("?" * len(column_names))})'
+        rows_per_statement = SQLITE_MAX_VARIABLES // len(column_names)
+
+        ids = {}
+        cursor = connection.connection.cursor()
+        for start in range(0, len(rows), rows_per_statement):
+            batch = rows[start:start + rows_per_statement]
+            cursor.execute(
+                f'INSERT OR IGNORE INTO {key_column.table.name}({", ".join(column_names)}) '
+                f'VALUES {", ".join([row_sql] * len(batch))} RETURNING {key_column.name}, id',
+                [row[column_name] for row in batch for column_name in column_names]
+            )
+            ids.update(cursor.fetchall())
+        cursor.close()
+        return ids
+
+    def _get_id_map(self, connection, key_column, keys=None) -> dict:
+        """select the integer ids for a collection of unique keys
 
-                        # business attributes table
-                        business_attributes_statement = Insert(business_attributes_table).values(
-                            [{'attribute_id': entry[0], 'business_id': business_id, 'value': attributes[entry[1]].strip()} for entry in attribute_ids_terms]
-                        )
-                        conn.execute(business_attributes_statement)
-                    else:
-                        pass
-
-                    # hours
-                    if business['hours'] is not None:
-                        # clean up days
-                        days_dict = [(day, hours) for day, hours in business['hours'].items() if hours != '0:0-0:0']
-                        hours_insert_statement = Insert(hours_table).values(
-                            [{'business_id': business_id, 'day_id': day_id_dict[day], 'open_hours': hours} for day, hours in days_dict]
+        Args:
+            connection: sqlalchemy connection
+            key_column: sqlalchemy column holding the unique keys, the table must have an id column
+            keys (Iterable[str] | None, optional): keys to look up. Defaults to None, every row in the table.
+
+        Returns:
+            dict: {key[str]: id[int]} for the keys found in the table
+        """
+        id_statement = select([key_column, key_column.table.c.id])
+        if keys is not None:
+            id_statement = id_statement.where(key_column.in_(list(keys)))
+        return dict(connection.execute(id_statement).fetchall())
+
+    def _scan_business_vocab(self, business_file_path:Path) -> tuple:
+        """first pass over business.json collecting every category and attribute name,
+            so the category and attributes tables can be filled before the businesses.
+            also builds the attribute table, each distinct (attribute, raw value) item
+            is flattened once here and the main pass only looks the items up.
+
+        Args:
+            business_file_path (Path): file Path object for business.json
+
+        Returns:
+            tuple[list[str], list[str], dict]: category names and attribute names in the order first seen,
+                                               attribute table {(attribute, raw value): ((name, value), ...)}
+        """
+        seen_business_ids = set()
+        category_names = {}
+        attribute_table = {}
+        for business in file_line_generator(business_file_path, drop_cache=False):
+            business_id_str = business['business_id'].strip()
+            if business_id_str in seen_business_ids:
+                continue
+            seen_business_ids.add(business_id_str)
+
+            if business['categories'] is not None:
+                category_names.update(dict.fromkeys(category.strip() for category in business['categories'].split(', ')))
+            if business['attributes'] is not None:
+                for item in business['attributes'].items():
+                    if item not in attribute_table:
+                        attribute_table[item] = tuple(
+                            (name.strip(), value.strip()) for name, value in flatten_dict(dict([item])).items()
                         )
-                        conn.execute(hours_insert_statement)
-                    else:
-                        pass
 
+        attribute_names = dict.fromkeys(name for pairs in attribute_table.values() for name, _ in pairs)
+
+        return list(category_names), list(attribute_names), attribute_table
+
+    def _insert_business_chunk(self, connection, chunk:pd.DataFrame, id_maps:dict, attribute_table:dict) -> None:
+        """insert a chunk of businesses and their categories, attributes and hours
+            with multi-row inserts. businesses already in the business id map are skipped.
+
+        Args:
+            connection: sqlalchemy connection
+            chunk (DataFrame): chunk of business.json read by pandas.read_json
+            id_maps (dict): {'business': {business_id_str: id}, 'category': {name: id},
+                             'attributes': {name: id}, 'days': {day: id}}, the business map is updated in place
+            attribute_table (dict): {(attribute, raw value): ((name, value), ...)} from self._scan_business_vocab
+        """
+        business_table = self.meta_data.tables['business']
+        business_ids = id_maps['business']
+
+        for column in BUSINESS_STR_COLUMNS:
+            chunk[column] = chunk[column].fillna('').str.strip()
+        chunk['business_id_str'] = chunk['business_id']
+        chunk = chunk.drop_duplicates('business_id_str')
+        chunk = chunk[~chunk['business_id_str'].isin(business_ids.keys())].copy()
+        if chunk.empty:
+            return
+
+        # business table
+        last_id = max(business_ids.values(), default=0)
+        chunk[BUSINESS_COLUMNS].to_sql('business', connection, if_exists='append', index=False, method='multi', chunksize=TO_SQL_CHUNK_SIZE)
+        new_ids_statement = select([business_table.c.business_id_str, business_table.c.id]).where(business_table.c.id > last_id)
+        business_ids.update(connection.execute(new_ids_statement).fetchall())
+        chunk['business_id'] = chunk['business_id_str'].map(business_ids)
+
+        # category and category business tables
+        categories = chunk[['business_id', 'categories']].dropna()
+        categories['name'] = categories.pop('categories').str.split(', ')
+        categories = categories.explode('name')
+        categories['name'] = categories['name'].str.strip()
+        categories = categories.drop_duplicates()
+        if not categories.empty:
+            categories['category_id'] = categories['name'].map(id_maps['category'])
+            categories[['category_id', 'business_id']].to_sql(
+                'category_business', connection, if_exists='append', index=False, method='multi', chunksize=TO_SQL_CHUNK_SIZE
+            )
+
+        # attributes and business attributes tables
+        attributes = chunk[['business_id', 'attributes']].dropna()
+        attributes['attribute'] = attributes.pop('attributes').map(
+            lambda attribute_dict: [pair for item in attribute_dict.items() for pair in attribute_table[item]]
+        )
+        attributes = attributes.explode('attribute').dropna()
+        if not attributes.empty:
+            attributes['name'] = attributes['attribute'].str[0]
+            attributes['value'] = attributes['attribute'].str[1]
+            attributes['attribute_id'] = attributes['name'].map(id_maps['attributes'])
+            attributes[['attribute_id', 'business_id', 'value']].to_sql(
+                'business_attributes', connection, if_exists='append', index=False, method='multi', chunksize=TO_SQL_CHUNK_SIZE
+            )
+
+        # hours
+        hours = chunk[['business_id', 'hours']].dropna()
+        hours['day_hours'] = hours.pop('hours').map(lambda hours_dict: list(hours_dict.items()))
+        hours = hours.explode('day_hours').dropna()
+        hours['day_id'] = hours['day_hours'].str[0].map(id_maps['days'])
+        hours['open_hours'] = hours['day_hours'].str[1]
+        # clean up days
+        hours = hours[hours['open_hours'] != '0:0-0:0']
+        if not hours.empty:
+            hours[['business_id', 'day_id', 'open_hours']].to_sql(
+                'hours', connection, if_exists='append', index=False, method='multi', chunksize=TO_SQL_CHUNK_SIZE
+            )
 
     def _load_users_json(self, users_file_path:Path, verbose:bool):
         """populates the users and user associated tables from user.json
@@ -462,8 +847,7 @@ class YelpDataBase:
 
         self.verbose_loading(users_file_path.name, False, verbose)
 
-        users_table = Table('users', self.meta_data, autoload_with=self.engine)
-        elite_table = Table('elite', self.meta_data, autoload_with=self.engine)
+        users_table = self.meta_data.tables['users']
 
         def fix_split_elite(elite_str:str) -> list:
             """split the year elite string and fix 2020
@@ -474,54 +858,61 @@ class YelpDataBase:
             Returns:
                 list[int]: years
             """
-            elite = re.sub(r'20,20', r'2020', elite_str)
-            return [int(year.strip()) for year in elite.split(',')]
+            elite = elite_str.replace('20,20', '2020').replace(' ', '')
+            return [int(year) for year in elite.split(',')]
         
 
-        with self.engine.begin() as conn:
-            for user in file_line_generator(users_file_path):
-
-                
-
-                users_statement = Insert(users_table).values(
-                    user_id_str=user['user_id'],
-                    name=user['name'],
-                    review_count=user['review_count'],
-                    yelping_since=user['yelping_since'],
-                    useful=user['useful'],
-                    funny=user['funny'],
-                    cool=user['cool'],
-                    fans=user['fans'],
-                    average_stars=user['average_stars'],
-                    compliment_hot=user['compliment_hot'],
-                    compliment_more=user['compliment_more'],
-                    compliment_profile=user['compliment_profile'],
-                    compliment_cute=user['compliment_cute'],
-                    compliment_list=user['compliment_list'],
-                    compliment_note=user['compliment_note'],
-                    compliment_plain=user['compliment_plain'],
-                    compliment_cool=user['compliment_cool'],
-                    compliment_funny=user['compliment_funny'],
-                    compliment_writer=user['compliment_writer'],
-                    compliment_photos=user['compliment_photos']
-                )
-                try:
-                    user_id = conn.execute(users_statement).inserted_primary_key[0]
-                except IntegrityError:
+        insert_elite_sql = self._raw_insert_sql('elite')
+
+        with self.engine.connect() as conn:
+            transaction = conn.begin()
+            user_ids = self._get_id_map(conn, users_table.c.user_id_str)
+            id_maps = {'user_id': (users_table.c.user_id_str, user_ids)}
+            user_rows = {}
+            elite_rows = []
+            for line_number, user in enumerate(file_line_generator(users_file_path, drop_cache=False), start=1):
+                if line_number % CHECKPOINT_ROWS == 0:
+                    transaction = self._checkpoint(transaction)
+
+                if user['user_id'] in user_ids or user['user_id'] in user_rows:
                     continue
 
+                user_rows[user['user_id']] = {
+                    'user_id_str': user['user_id'],
+                    'name': user['name'],
+                    'review_count': user['review_count'],
+                    'yelping_since': user['yelping_since'],
+                    'useful': user['useful'],
+                    'funny': user['funny'],
+                    'cool': user['cool'],
+                    'fans': user['fans'],
+                    'average_stars': user['average_stars'],
+                    'compliment_hot': user['compliment_hot'],
+                    'compliment_more': user['compliment_more'],
+                    'compliment_profile': user['compliment_profile'],
+                    'compliment_cute': user['compliment_cute'],
+                    'compliment_list': user['compliment_list'],
+                    'compliment_note': user['compliment_note'],
+                    'compliment_plain': user['compliment_plain'],
+                    'compliment_cool': user['compliment_cool'],
+                    'compliment_funny': user['compliment_funny'],
+                    'compliment_writer': user['compliment_writer'],
+                    'compliment_photos': user['compliment_photos']
+                }
+
                 if user['elite'] is not None and user['elite'] != '':
-                    years_elite = fix_split_elite(user['elite'])
-                    if years_elite:
+                    elite_rows.extend({'user_id': user['user_id'], 'year': year} for year in fix_split_elite(user['elite']))
 
-                        years_elite_statement = Insert(elite_table).values(
-                            [{'user_id': user_id, 'year': year} for year in years_elite]
-                        )
+                if len(user_rows) >= ROW_BATCH_SIZE:
+                    user_ids.update(self._insert_returning_ids(conn, users_table.c.user_id_str, list(user_rows.values())))
+                    user_rows.clear()
+                    self._flush_rows(conn, insert_elite_sql, elite_rows, id_maps)
 
-                        conn.execute(years_elite_statement)
-                    else:
-                        pass
+            if user_rows:
+                user_ids.update(self._insert_returning_ids(conn, users_table.c.user_id_str, list(user_rows.values())))
+            self._flush_rows(conn, insert_elite_sql, elite_rows, id_maps)
 
+            transaction.commit()
 
 
     def _connect_users(self, users_file_path:Path, verbose:bool):
@@ -529,6 +920,9 @@ class YelpDataBase:
             count the friends and add them to the friend count column
             in the user table. if the user exist in the users table
             then add the user to the friends table.
+            the friend pairs are streamed into a temporary staging table,
+            resolved with a single join and counted with a single UPDATE ... FROM
+            (sqlite 3.33 or newer).
 
         Args:
             users_file_path (Path): path to the users.json
@@ -537,73 +931,117 @@ class YelpDataBase:
 
         self.verbose_loading('', True, verbose)
 
-        users_table = Table('users', self.meta_data, autoload_with=self.engine)
-        friends_table = Table('friends', self.meta_data, autoload_with=self.engine)
+        with self.engine.connect() as conn:
+            transaction = conn.begin()
+            conn.execute(text('CREATE TEMP TABLE IF NOT EXISTS friends_staging(u TEXT, f TEXT)'))
+            insert_staging_sql = 'INSERT INTO friends_staging(u, f) VALUES (?, ?)'
 
-        with self.engine.begin() as conn:
-            for user in file_line_generator(users_file_path):
+            staging_rows = []
+            for line_number, user in enumerate(file_line_generator(users_file_path), start=1):
+                if line_number % CHECKPOINT_ROWS == 0:
+                    transaction = self._checkpoint(transaction)
 
+                staging_rows.extend((user['user_id'], friend.strip()) for friend in user['friends'].split(', '))
 
-                get_user_id_statement = select([users_table.c.id]).where(users_table.c.user_id_str == user['user_id'])
-                user_id = conn.execute(get_user_id_statement).fetchall()
+                if line_number % FRIENDS_BATCH_SIZE == 0:
+                    conn.connection.executemany(insert_staging_sql, staging_rows)
+                    staging_rows.clear()
 
+            if staging_rows:
+                conn.connection.executemany(insert_staging_sql, staging_rows)
 
-                friends_list = [friend.strip() for friend in user['friends'].split(', ')]
-                friend_count = len(friends_list)
+            conn.execute(text('CREATE INDEX IF NOT EXISTS temp.ix_stg_u ON friends_staging(u)'))
 
-                frined_count_statement = update(users_table).where(users_table.c.id == user_id[0][0]).values(friend_count=friend_count)
-                conn.execute(frined_count_statement)
+            conn.execute(text(
+                """INSERT OR IGNORE INTO friends(user1_id, user2_id)
+                SELECT u.id, f.id
+                FROM friends_staging s
+                JOIN users u ON u.user_id_str = s.u
+                JOIN users f ON f.user_id_str = s.f"""
+            ))
 
-                get_friend_ids_statement = select([users_table.c.id]).where(users_table.c.user_id_str.in_(friends_list))
-                friend_ids = conn.execute(get_friend_ids_statement).fetchall()
-                
-                if not friend_ids:
-                    continue
+            # one grouped pass over the staging table instead of a count per user
+            conn.execute(text(
+                """UPDATE users
+                SET friend_count = staged.friend_count
+                FROM (SELECT u, COUNT(*) AS friend_count FROM friends_staging GROUP BY u) AS staged
+                WHERE users.user_id_str = staged.u"""
+            ))
 
-                pair_friends_statement = Insert(friends_table).values(
-                    [{'user1_id': user_id[0][0], 'user2_id': friend[0]} for friend in friend_ids]
-                ).on_conflict_do_nothing()
+            conn.execute(text('DROP TABLE friends_staging'))
 
-                conn.execute(pair_friends_statement)
+            transaction.commit()
 
 
-    def _load_review_json(self, review_file_path:Path, verbose:bool):
+    def _parse_reviews_in_parallel(self, review_file_path:Path, review_ranges:list):
+        """parses the byte ranges of review.json in a process pool, each range into
+            its own temporary database file next to the database
+
+        Args:
+            review_file_path (Path): path to review.json file
+            review_ranges (list[tuple[int, int]]): byte ranges from _index_jsonl
+
+        Yields:
+            tuple: review values in REVIEW_COLUMNS order, in file order
+        """
+        database_path = Path(self.database_path)
+        staging_paths = [database_path.with_name(f'reviews_{number}_tmp.db') for number in range(len(review_ranges))]
+        for staging_path in staging_paths:
+            staging_path.unlink(missing_ok=True)
+
+        with ProcessPoolExecutor() as executor:
+            futures = [
+                executor.submit(_parse_review_range, str(staging_path), review_file_path, start, end)
+                for staging_path, (start, end) in zip(staging_paths, review_ranges)
+            ]
+            for future, staging_path in zip(futures, staging_paths):
+                future.result()
+                staging = sqlite3.connect(staging_path)
+                yield from staging.execute('SELECT * FROM reviews_staging ORDER BY rowid')
+                staging.close()
+                staging_path.unlink()
+
+    def _load_review_json(self, review_file_path:Path, verbose:bool, parallel:bool=False):
         """populate the reviews table from the reviews.json file
 
         Args:
             review_file_path (Path): path to review.json file
             vebose (bool): print out progress using self.verbose_loading
+            parallel (bool, optional): parse the file in REVIEW_RANGE_BYTES ranges across
+                                       processes when it has more than one. Defaults to False.
         """
 
         self.verbose_loading(review_file_path.name, False, verbose)
 
-        users_table = Table('users', self.meta_data, autoload_with=self.engine)
-        business_table = Table('business', self.meta_data, autoload_with=self.engine)
-        review_table = Table('reviews', self.meta_data, autoload_with=self.engine)
-
-        with self.engine.begin() as conn:
-            for review in file_line_generator(review_file_path):
+        review_ranges = _index_jsonl(review_file_path) if parallel else []
+        if len(review_ranges) > 1:
+            reviews = self._parse_reviews_in_parallel(review_file_path, review_ranges)
+        else:
+            reviews = (tuple(review[key] for key in REVIEW_KEYS) for review in file_line_generator(review_file_path))
 
+        users_table = self.meta_data.tables['users']
+        business_table = self.meta_data.tables['business']
 
+        insert_review_sql = self._raw_insert_sql('reviews')
 
-                user_id = self._get_add_user_id(conn, users_table, review['user_id'])
-                business_id = self._get_add_business_id(conn, business_table, review['business_id'])
-                
+        with self.engine.connect() as conn:
+            transaction = conn.begin()
+            id_maps = {
+                'user_id': (users_table.c.user_id_str, self._get_id_map(conn, users_table.c.user_id_str)),
+                'business_id': (business_table.c.business_id_str, self._get_id_map(conn, business_table.c.business_id_str))
+            }
+            review_rows = []
+            for line_number, review in enumerate(reviews, start=1):
+                if line_number % CHECKPOINT_ROWS == 0:
+                    transaction = self._checkpoint(transaction)
 
-                review_statement = Insert(review_table).values(
-                    review_id_str=review['review_id'],
-                    user_id=user_id,
-                    business_id=business_id,
-                    stars=review['stars'],
-                    date=review['date'],
-                    text=review['text'],
-                    useful=review['useful'],
-                    funny=review['funny'],
-                    cool=review['cool']
-                ).on_conflict_do_nothing()
+                review_rows.append(dict(zip(REVIEW_COLUMNS, review)))
+                if len(review_rows) >= ROW_BATCH_SIZE:
+                    self._flush_rows(conn, insert_review_sql, review_rows, id_maps)
 
-                conn.execute(review_statement)
+            self._flush_rows(conn, insert_review_sql, review_rows, id_maps)
 
+            transaction.commit()
 
 
     def _load_checkin_json(self, checkin_file_path:Path, verbose:bool):
@@ -616,21 +1054,29 @@ class YelpDataBase:
 
         self.verbose_loading(checkin_file_path.name, False, verbose)
 
-        checkin_table = Table('checkins', self.meta_data, autoload_with=self.engine)
-        business_table = Table('business', self.meta_data, autoload_with=self.engine)
+        business_table = self.meta_data.tables['business']
 
-        with self.engine.begin() as conn:
-            for checkin in file_line_generator(checkin_file_path):
+        # one row per date, the comma separated dates are split by sqlite's json_each
+        insert_checkin_sql = """INSERT INTO checkins(business_id, date)
+            SELECT :business_id, trim(value) FROM json_each(:dates)"""
 
-                checkin_dates = [date.strip() for date in checkin['date'].split(',')]
+        with self.engine.connect() as conn:
+            transaction = conn.begin()
+            id_maps = {
+                'business_id': (business_table.c.business_id_str, self._get_id_map(conn, business_table.c.business_id_str))
+            }
+            checkin_rows = []
+            for line_number, checkin in enumerate(file_line_generator(checkin_file_path), start=1):
+                if line_number % CHECKPOINT_ROWS == 0:
+                    transaction = self._checkpoint(transaction)
 
-                business_id = self._get_add_business_id(conn, business_table, checkin['business_id'])
+                checkin_rows.append({'business_id': checkin['business_id'], 'dates': json.dumps(checkin['date'].split(','))})
+                if len(checkin_rows) >= ROW_BATCH_SIZE:
+                    self._flush_rows(conn, insert_checkin_sql, checkin_rows, id_maps)
 
-                checkin_statement = Insert(checkin_table).values(
-                    [{'business_id': business_id, 'date': date} for date in checkin_dates]
-                )
+            self._flush_rows(conn, insert_checkin_sql, checkin_rows, id_maps)
 
-                conn.execute(checkin_statement)
+            transaction.commit()
 
 
     def _load_tip_json(self, tip_file_path:Path, verbose:bool):
@@ -642,25 +1088,35 @@ class YelpDataBase:
         """
 
         self.verbose_loading(tip_file_path.name, False, verbose)
-        users_table = Table('users', self.meta_data, autoload_with=self.engine)
-        business_table = Table('business', self.meta_data, autoload_with=self.engine)
-        tips_table = Table('tips', self.meta_data, autoload_with=self.engine)
+        users_table = self.meta_data.tables['users']
+        business_table = self.meta_data.tables['business']
 
-        with self.engine.begin() as conn:
-            for tip in file_line_generator(tip_file_path):
-                
-                user_id = self._get_add_user_id(conn, users_table, tip['user_id'])
-                business_id = self._get_add_business_id(conn, business_table, tip['business_id'])
-
-                tip_insert_statement = Insert(tips_table).values(
-                    business_id=business_id,
-                    user_id=user_id,
-                    text=tip['text'],
-                    date=tip['date'],
-                    compliment_count=tip['compliment_count']
-                ).on_conflict_do_nothing()
+        insert_tip_sql = self._raw_insert_sql('tips')
 
-                conn.execute(tip_insert_statement)
+        with self.engine.connect() as conn:
+            transaction = conn.begin()
+            id_maps = {
+                'user_id': (users_table.c.user_id_str, self._get_id_map(conn, users_table.c.user_id_str)),
+                'business_id': (business_table.c.business_id_str, self._get_id_map(conn, business_table.c.business_id_str))
+            }
+            tip_rows = []
+            for line_number, tip in enumerate(file_line_generator(tip_file_path), start=1):
+                if line_number % CHECKPOINT_ROWS == 0:
+                    transaction = self._checkpoint(transaction)
+
+                tip_rows.append({
+                    'business_id': tip['business_id'],
+                    'user_id': tip['user_id'],
+                    'text': tip['text'],
+                    'date': tip['date'],
+                    'compliment_count': tip['compliment_count']
+                })
+                if len(tip_rows) >= ROW_BATCH_SIZE:
+                    self._flush_rows(conn, insert_tip_sql, tip_rows, id_maps)
+
+            self._flush_rows(conn, insert_tip_sql, tip_rows, id_maps)
+
+            transaction.commit()
 
 
     def _load_photos_json(self, photos_file_path:Path, verbose:bool):
@@ -673,22 +1129,32 @@ class YelpDataBase:
 
         self.verbose_loading(photos_file_path.name, False, verbose)
 
-        business_table = Table('business', self.meta_data, autoload_with=self.engine)
-        photos_table = Table('photos', self.meta_data, autoload_with=self.engine)
+        business_table = self.meta_data.tables['business']
 
-        with self.engine.begin() as conn:
-            for photo in file_line_generator(photos_file_path):
-                
-                business_id = self._get_add_business_id(conn, business_table, photo['business_id'])
-
-                photo_insert_statement = Insert(photos_table).values(
-                    photo_id_str=photo['photo_id'],
-                    business_id=business_id,
-                    caption=photo['caption'],
-                    label=photo['label']
-                ).on_conflict_do_nothing()
+        insert_photo_sql = self._raw_insert_sql('photos')
+
+        with self.engine.connect() as conn:
+            transaction = conn.begin()
+            id_maps = {
+                'business_id': (business_table.c.business_id_str, self._get_id_map(conn, business_table.c.business_id_str))
+            }
+            photo_rows = []
+            for line_number, photo in enumerate(file_line_generator(photos_file_path), start=1):
+                if line_number % CHECKPOINT_ROWS == 0:
+                    transaction = self._checkpoint(transaction)
 
-                conn.execute(photo_insert_statement)
+                photo_rows.append({
+                    'photo_id_str': photo['photo_id'],
+                    'business_id': photo['business_id'],
+                    'caption': photo['caption'],
+                    'label': photo['label']
+                })
+                if len(photo_rows) >= ROW_BATCH_SIZE:
+                    self._flush_rows(conn, insert_photo_sql, photo_rows, id_maps)
+
+            self._flush_rows(conn, insert_photo_sql, photo_rows, id_maps)
+
+            transaction.commit()
 
 
     def execute_sql_statement(self, statement:str, as_frame:bool=False):
@@ -722,10 +1188,14 @@ if __name__ == '__main__':
                         help="don't add photos.json",
                         action='store_false')
     
+    parser.add_argument('-s', '--serial', 
+                        help="load business.json and user.json one after the other instead of in parallel",
+                        action='store_false')
+    
     parser.add_argument('-v', '--verbose', 
                         help='Show progress/steps',
                         action='store_true')
     args = parser.parse_args()
 
     ydb = YelpDataBase(config_file_path=args.config_file_path)
-    ydb.create_full_database(verbose=args.verbose, include_photos=args.no_photos)
\ No newline at end of file
+    ydb.create_full_database(verbose=args.verbose, include_photos=args.no_photos, parallel=args.serial)
\ No newline at end of file
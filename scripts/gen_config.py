@@ -0,0 +1,56 @@
+"""
+writes a config .yaml file out as a python module of literals, so load_config
+can import it instead of parsing the yaml at runtime
+
+"""
+import os
+import yaml
+from pprint import pformat
+from pathlib import Path
+
+
+# name of the generated module, written next to the config file
+CONSTANTS_MODULE_NAME = 'config_constants.py'
+
+
+def generate_config_constants(config_file_path:str='config.yaml') -> Path:
+    """parses the config file and writes CONFIG (the parsed file) and SOURCE (the
+        config file name) to config_constants.py in the same folder. load_config
+        uses the module as long as it is not older than the config file.
+
+    Args:
+        config_file_path (str, optional): path to the config file. Defaults to 'config.yaml'.
+
+    Returns:
+        Path: path to the generated module
+    """
+    config_file_path = Path(config_file_path).resolve()
+    with open(config_file_path, 'r') as config_file:
+        config_obj = yaml.safe_load(config_file)
+
+    constants_path = config_file_path.with_name(CONSTANTS_MODULE_NAME)
+    source = (
+        f'"""\ngenerated by scripts/gen_config.py from {config_file_path.name}, do not edit\n\n"""\n'
+        # yaml timestamps are repr'd as datetime.date / datetime.datetime
+        'import datetime\n\n'
+        f'SOURCE = {config_file_path.name!r}\n\n'
+        f'CONFIG = {pformat(config_obj)}\n'
+    )
+
+    # written to a temporary file and renamed so load_config never imports a partial module
+    temp_path = constants_path.with_name(f'{constants_path.name}.{os.getpid()}.tmp')
+    with open(temp_path, 'w') as constants_file:
+        constants_file.write(source)
+    os.replace(temp_path, constants_path)
+    return constants_path
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description='Writes a config .yaml file to config_constants.py next to it')
+
+    parser.add_argument('config_file_path', type=str, nargs='?', default='config.yaml',
+                        help='path to config.yaml file, see readme.md for more info')
+    args = parser.parse_args()
+
+    print(f'wrote {generate_config_constants(args.config_file_path)}')
@@ -1,14 +1,110 @@
 """
 database utility functions
 """
+import os
+import sys
+import ast
+import keyword
+import mmap
+import queue
+import pickle
+import importlib.util
+import threading
 import yaml
-import json
 from pathlib import Path
+from functools import lru_cache
+from dataclasses import make_dataclass
 
+# libyaml's C parser when PyYAML was built with it, the pure python parser otherwise
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# orjson's decoder when it is installed, the standard library one otherwise. both accept bytes
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# pysimdjson is an optional faster decoder for file_line_generator, see USE_SIMDJSON
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# decode json lines with pysimdjson when it is installed, off by default
+USE_SIMDJSON = False
+
+# read buffer size used by file_line_generator, also the size of the chunks read by its reader thread
+FILE_BUFFER_SIZE = 4 << 20
+
+# number of chunks the reader thread can read ahead of the parsing
+READ_AHEAD_CHUNKS = 4
+
+# json files of at least this many bytes are memory mapped by iter_records_batched instead of read
+MMAP_THRESHOLD = 64 << 20
+
+# number of records per list yielded by iter_records_batched
+RECORD_BATCH_SIZE = 4096
+
+# module written next to the config file by scripts/gen_config.py, loaded by load_config instead of the yaml
+CONFIG_CONSTANTS_NAME = 'config_constants.py'
+
+# {(key, sub_key): interned flattened key} shared by every flatten_dict call
+_flat_key_cache = {}
+
+# {(class name, keys): frozen dataclass} generated by load_config_typed, one per config shape
+_config_classes = {}
+
+
+@lru_cache(maxsize=None)
+def _load_yaml_cached(file_path:Path, mtime_ns:int) -> dict:
+    """parses a yaml file, cached per (path, modification time) so a changed
+        file is parsed again. if scripts/gen_config.py generated a
+        CONFIG_CONSTANTS_NAME module from the file and the module is not older
+        than it, the module is imported instead. otherwise the parsed file is
+        pickled to a .pkl file next to it, which later processes load instead
+        of parsing the yaml as long as the pickle is not older than the yaml file.
+
+    Args:
+        file_path (Path): resolved path to the yaml file
+        mtime_ns (int): modification time of the file, only used as part of the cache key
+
+    Returns:
+        dict: parsed yaml, shared between calls so it should not be modified
+    """
+    constants_path = file_path.with_name(CONFIG_CONSTANTS_NAME)
+    if constants_path.exists() and constants_path.stat().st_mtime_ns >= mtime_ns:
+        spec = importlib.util.spec_from_file_location('config_constants', constants_path)
+        config_constants = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(config_constants)
+        if config_constants.SOURCE == file_path.name:
+            return config_constants.CONFIG
+
+    pickle_path = file_path.with_name(file_path.name + '.pkl')
+    if pickle_path.exists() and pickle_path.stat().st_mtime_ns >= mtime_ns:
+        with open(pickle_path, 'rb', buffering=1 << 20) as pickle_file:
+            return pickle.load(pickle_file)
+
+    with open(file_path, 'r') as config_file:
+        config_obj = yaml.load(config_file, Loader=_YamlLoader)
+
+    # written to a temporary file and renamed so other processes never read a partial pickle
+    temp_path = pickle_path.with_name(f'{pickle_path.name}.{os.getpid()}.tmp')
+    try:
+        with open(temp_path, 'wb') as pickle_file:
+            pickle.dump(config_obj, pickle_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, pickle_path)
+    except OSError:
+        temp_path.unlink(missing_ok=True)
+
+    return config_obj
 
 
 def load_config(file_path:str='config.yaml', category:str|None=None) -> dict|None:
-    """Loads the config.yaml file
+    """Loads the config.yaml file, the parsed file is reused
+        until its modification time changes
 
     Args:
         file_path (str, optional): File path to config file. 
@@ -20,8 +116,8 @@ def load_config(file_path:str='config.yaml', category:str|None=None) -> dict|Non
         dict | None: config dictionary object or None if the category 
                      is not None and not found in the config object
     """
-    with open(file_path, 'r') as config_file:
-        config_obj = yaml.safe_load(config_file)
+    file_path = Path(file_path).resolve()
+    config_obj = _load_yaml_cached(file_path, file_path.stat().st_mtime_ns)
     if category is None:
         return config_obj
     
@@ -32,6 +128,74 @@ def load_config(file_path:str='config.yaml', category:str|None=None) -> dict|Non
         return None
 
 
+def load_config_typed(file_path:str='config.yaml', category:str|None=None):
+    """Loads the config.yaml file like load_config, with the mappings turned into
+        frozen slotted dataclass instances so values are read as attributes
+
+    Args:
+        file_path (str, optional): File path to config file. 
+                                   Defaults to 'config.yaml'.
+        category (str | None, optional): A subcategory to load from the config file. 
+                                         Defaults to None.
+
+    Returns:
+        object | None: config object or None if the category 
+                       is not None and not found in the config object
+
+    Example:
+        config_obj = load_config_typed('config.yaml', 'database')
+
+        print(config_obj.database_file_path)
+    """
+    file_path = Path(file_path).resolve()
+    return _load_config_typed_cached(file_path, file_path.stat().st_mtime_ns, category)
+
+
+@lru_cache(maxsize=None)
+def _load_config_typed_cached(file_path:Path, mtime_ns:int, category:str|None):
+    """builds the load_config_typed object once per (path, modification time, category),
+        the objects are immutable so they can be shared between calls
+
+    Args:
+        file_path (Path): resolved path to the yaml file
+        mtime_ns (int): modification time of the file, only used as part of the cache key
+        category (str | None): A subcategory to load from the config file
+
+    Returns:
+        object | None: config object or None if the category is not found
+    """
+    config_obj = load_config(file_path, category)
+    if config_obj is None:
+        return None
+    return _to_config_object(category or 'config', config_obj)
+
+
+def _to_config_object(name:str, value):
+    """turns the dicts in a parsed yaml value into frozen slotted dataclass instances
+        and the lists into tuples. dicts whose keys are not all valid attribute
+        names are left as dicts
+
+    Args:
+        name (str): yaml key the value was found under, used to name the dataclass
+        value: parsed yaml value
+
+    Returns:
+        the converted value
+    """
+    if type(value) is dict:
+        keys = tuple(value)
+        if all(type(key) is str and key.isidentifier() and not keyword.iskeyword(key) for key in keys):
+            config_class = _config_classes.get((name, keys))
+            if config_class is None:
+                class_name = ''.join(part.title() for part in name.split('_')) if name.isidentifier() else 'Config'
+                config_class = _config_classes[(name, keys)] = make_dataclass(class_name, keys, frozen=True, slots=True)
+            return config_class(**{key: _to_config_object(key, sub_value) for key, sub_value in value.items()})
+        return {key: _to_config_object(key if type(key) is str else name, sub_value) for key, sub_value in value.items()}
+    if type(value) is list:
+        return tuple(_to_config_object(name, item) for item in value)
+    return value
+
+
 def flatten_dict(attribute_dict:dict) -> dict:
     """flattens a dictionarry with max depth of 2.
 
@@ -39,7 +203,10 @@ def flatten_dict(attribute_dict:dict) -> dict:
         attribute_dict (dict): The dict to flatten
 
     Returns:
-        dict: flattened dict, all values returned as strings
+        dict: flattened dict, all values returned as strings.
+              values are read as python literals with ast.literal_eval,
+              values that are not literals are kept as the string itself.
+              an empty dict if attribute_dict is None
 
     Example:
         input_dict = {
@@ -61,37 +228,191 @@ def flatten_dict(attribute_dict:dict) -> dict:
         }
     """
     if attribute_dict is None:
-        return None
-    attributes = {}
+        return {}
+    return dict(_iter_pairs(attribute_dict))
+
+
+def flatten_dict_batch(attribute_dicts:list) -> dict:
+    """flattens a list of dicts like flatten_dict, returned as columns
+        that can be zipped into executemany parameters
+
+    Args:
+        attribute_dicts (list[dict | None]): The dicts to flatten
+
+    Returns:
+        dict[str, list[str | None]]: {flattened key: values} with one value per input dict,
+                                     None where a dict does not have the key
+    """
+    columns = {}
+    for row_number, attribute_dict in enumerate(attribute_dicts):
+        if attribute_dict is None:
+            continue
+        for key, value in _iter_pairs(attribute_dict):
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [None] * len(attribute_dicts)
+            column[row_number] = value
+    return columns
+
+
+def _iter_pairs(attribute_dict:dict):
+    """flattens one level of nested dicts for flatten_dict
+
+    Args:
+        attribute_dict (dict): The dict to flatten
+
+    Yields:
+        tuple[str, str]: (flattened key, value as a string)
+    """
+    literal_eval = ast.literal_eval
+    _str = str
+    intern = sys.intern
+    flat_key_cache = _flat_key_cache
     for key, value in attribute_dict.items():
-        value = eval(value)
-        if isinstance(value, dict):
+        try:
+            value = literal_eval(value)
+        except (ValueError, TypeError, SyntaxError):
+            pass
+        # literal_eval and json only build plain dicts, so no subclass check is needed
+        if type(value) is dict:
             for sub_key, sub_value in value.items():
-                attributes[key + '_' + sub_key] = str(sub_value)
+                flat_key = flat_key_cache.get((key, sub_key))
+                if flat_key is None:
+                    flat_key = flat_key_cache[(key, sub_key)] = intern(f'{key}_{sub_key}')
+                yield flat_key, _str(sub_value)
         else:
-            attributes[key] = str(value)
-    return attributes
+            yield intern(key), _str(value)
 
-def file_line_generator(file_name:str|Path, file_type:str='json'):
-    """loads a file line by line
+def _read_chunks(file, chunk_queue:queue.Queue, chunk_size:int, stop:threading.Event) -> None:
+    """reader thread for file_line_generator, puts chunks of the file on the queue
+        until the end of the file, marked by an empty chunk, or until stop is set.
+        an exception raised while reading is put on the queue instead.
+
+    Args:
+        file: open file object or mmap
+        chunk_queue (queue.Queue): queue the chunks are put on
+        chunk_size (int): size of a chunk
+        stop (threading.Event): set by the consumer when it stops early
+    """
+    try:
+        while not stop.is_set():
+            chunk = file.read(chunk_size)
+            chunk_queue.put(chunk)
+            if not chunk:
+                return
+    except Exception as error:
+        chunk_queue.put(error)
+
+
+def file_line_generator(file_name:str|Path, file_type:str='json', buffering:int=FILE_BUFFER_SIZE,
+                        use_simdjson:bool=USE_SIMDJSON, drop_cache:bool=True):
+    """loads a file line by line, one record at a time from iter_records_batched
 
     Args:
         file_name (str | Path): path to file
         file_type (str, optional): 'json' or 'txt'. Defaults to 'json'.
+        buffering (int, optional): read buffer size in bytes. Defaults to FILE_BUFFER_SIZE.
+        use_simdjson (bool, optional): decode json with pysimdjson if it is installed. Defaults to USE_SIMDJSON.
+        drop_cache (bool, optional): evict the file from the page cache once it has been read.
+                                     Defaults to True, pass False if the file is read again right away.
 
     Yields:
-        dict | str: yields dict from json.loads(line) if file_type is 'json' 
+        dict | str: yields dict from json_loads(line) if file_type is 'json' 
                     otherwise it strips the new line character and 
                     returns the line as a string
     """
+    for records in iter_records_batched(file_name, file_type, buffering=buffering, use_simdjson=use_simdjson, drop_cache=drop_cache):
+        yield from records
+
+
+def iter_records_batched(file_name:str|Path, file_type:str='json', batch:int=RECORD_BATCH_SIZE, buffering:int=FILE_BUFFER_SIZE,
+                         use_simdjson:bool=USE_SIMDJSON, drop_cache:bool=True):
+    """loads a file in lists of records. the file is read in chunks by a background
+        thread, so reading the next chunk overlaps with parsing this one. json files
+        of MMAP_THRESHOLD bytes or more are read from a memory map of the file.
+
+    Args:
+        file_name (str | Path): path to file
+        file_type (str, optional): 'json' or 'txt'. Defaults to 'json'.
+        batch (int, optional): number of records per list, the last list can be shorter.
+                               Defaults to RECORD_BATCH_SIZE.
+        buffering (int, optional): read buffer size in bytes. Defaults to FILE_BUFFER_SIZE.
+        use_simdjson (bool, optional): decode json with pysimdjson if it is installed. Defaults to USE_SIMDJSON.
+        drop_cache (bool, optional): evict the file from the page cache once it has been read.
+                                     Defaults to True, pass False if the file is read again right away.
+
+    Yields:
+        list[dict] | list[str]: a new list of records each time, parsed as in file_line_generator
+    """
+
+    if file_type == 'json':
+        # json lines are decoded straight from bytes, skipping the text layer
+        mode = 'rb'
+        newline = None
+        separator = b'\n'
+        if use_simdjson and simdjson is not None:
+            # one parser for the whole file so its buffers are reused between lines
+            simdjson_parser = simdjson.Parser()
+            def parse(line:bytes) -> dict:
+                return simdjson_parser.parse(line).as_dict()
+        else:
+            parse = json_loads
+    else:
+        # newline='' skips universal newline translation, strip() removes a trailing '\r'
+        mode = 'r'
+        newline = ''
+        separator = '\n'
+        parse = str.strip
+
+    with open(file_name, mode, buffering=buffering, newline=newline) as user_file:
+        # ask the kernel for aggressive readahead, the file is read front to back once
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(user_file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        # chunks are copied straight out of the mapped pages, skipping the file object's buffer
+        if mode == 'rb' and os.fstat(user_file.fileno()).st_size >= MMAP_THRESHOLD:
+            source = mmap.mmap(user_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                source.madvise(mmap.MADV_SEQUENTIAL)
+        else:
+            source = user_file
 
-    with open(file_name, 'r') as user_file:
-        while True:
-            line = user_file.readline()
-            if line:
-                if file_type == 'json':
-                    yield json.loads(line)
-                else:
-                    yield line.rstrip('\n').strip()
-            else:
-                break
+        chunk_queue = queue.Queue(maxsize=READ_AHEAD_CHUNKS)
+        stop = threading.Event()
+        reader = threading.Thread(target=_read_chunks, args=(source, chunk_queue, buffering, stop), daemon=True)
+        reader.start()
+        try:
+            # the partial line at the end of a chunk is completed by the next one
+            partial = separator[:0]
+            records = []
+            while True:
+                chunk = chunk_queue.get()
+                if isinstance(chunk, Exception):
+                    raise chunk
+                if not chunk:
+                    break
+                lines = (partial + chunk).split(separator)
+                partial = lines.pop()
+                records.extend(map(parse, lines))
+                if len(records) >= batch:
+                    full = len(records) - len(records) % batch
+                    for start in range(0, full, batch):
+                        yield records[start:start + batch]
+                    records = records[full:]
+            if partial:
+                records.append(parse(partial))
+            if records:
+                yield records
+        finally:
+            # unblock the reader if the generator was closed before the end of the file
+            stop.set()
+            while reader.is_alive():
+                try:
+                    chunk_queue.get_nowait()
+                except queue.Empty:
+                    reader.join(0.01)
+            if source is not user_file:
+                source.close()
+            # a one pass scan of a multi GB file should not push everything else out of the page cache
+            if drop_cache and hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(user_file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)